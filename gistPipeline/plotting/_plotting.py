@@ -32,7 +32,7 @@ def generatePlots(config, module):
         try:
             printStatus.running("Producing maps from the emission-line analysis")
             if os.path.isfile(outputPrefix + "_gas_BIN.fits") == True:
-                # gistPlot_gas.plotMaps(config['GENERAL']['OUTPUT'], 'BIN', True)
+                # gistPlot_gas.plotMaps(config['GENERAL']['OUTPUT'], 'BIN', True, NCPU=config['GENERAL']['NCPU'])
                 save_maps_fits.savefitsmaps_GASmodule(
                     "gas",
                     config["GENERAL"]["OUTPUT"],
@@ -6,16 +6,17 @@ import warnings
 
 import numpy as np
 from astropy.io import fits
-from astropy.table import Table
 
 warnings.filterwarnings("ignore")
 # import matplotlib
 # matplotlib.use('pdf')
 #
 import matplotlib.pyplot as plt
+from matplotlib.colors import Normalize
 from matplotlib.ticker import FuncFormatter, MultipleLocator
 from matplotlib.tri import TriAnalyzer, Triangulation
 from mpl_toolkits.axes_grid1 import AxesGrid
+from multiprocess import Process, Queue
 from plotbin.sauron_colormap import register_sauron_colormap
 
 register_sauron_colormap()
@@ -62,6 +63,53 @@ def setup_plot(usetex=False):
     # plt.rcParams['text.latex.preamble'] = [r'\boldmath']
 
 
+def get_pixelgrid(X, Y, pixelsize):
+    """
+    Return the extent of the image, the pixel indices of all spaxels and an
+    empty image. Only the pixels at the spaxel positions are ever written, so
+    the image can be reused for all maps with the same spatial coordinates.
+    """
+    xmin = np.nanmin(X) - 6
+    xmax = np.nanmax(X) + 6
+    ymin = np.nanmin(Y) - 6
+    ymax = np.nanmax(Y) + 6
+    npixels_x = int(np.round((xmax - xmin) / pixelsize) + 1)
+    npixels_y = int(np.round((ymax - ymin) / pixelsize) + 1)
+    i = np.rint((X - xmin) / pixelsize).astype(np.intp)
+    j = np.rint((Y - ymin) / pixelsize).astype(np.intp)
+    image = np.full((npixels_y, npixels_x), np.nan)
+
+    return xmin, xmax, ymin, ymax, i, j, image
+
+
+def setup_figure():
+    fig = plt.figure(figsize=(5, 5))
+    grid = AxesGrid(
+        fig,
+        111,
+        nrows_ncols=(1, 1),
+        axes_pad=0.0,
+        share_all=True,
+        label_mode="L",
+        cbar_location="right",
+        cbar_mode="single",
+        cbar_size="6%",
+    )
+
+    return fig, grid
+
+
+def reshow_figure(fig):
+    """
+    Attach a figure whose window has been closed to a new window, so that it
+    can be shown again in the interactive mode.
+    """
+    manager = plt.figure(figsize=fig.get_size_inches()).canvas.manager
+    manager.canvas.figure = fig
+    fig.set_canvas(manager.canvas)
+    fig.number = manager.num
+
+
 def plot_line(
     val,
     LEVEL,
@@ -77,21 +125,28 @@ def plot_line(
     pixelsize,
     outdir,
     rootname,
+    pixelgrid=None,
+    fig=None,
+    grid=None,
 ):
-    # Setup main figure
-    setup_plot(usetex=True)
-    fig = plt.figure(figsize=(5, 5))
-    grid = AxesGrid(
-        fig,
-        111,
-        nrows_ncols=(1, 1),
-        axes_pad=0.0,
-        share_all=True,
-        label_mode="L",
-        cbar_location="right",
-        cbar_mode="single",
-        cbar_size="6%",
-    )
+    """
+    Plot and save the map of a single line. The caller must run setup_plot()
+    first, as the fonts, the dpi and the tight bounding box of the saved
+    figure are all taken from the rcParams set there.
+    """
+    # Do not produce empty plots
+    if np.all(np.isnan(val)):
+        return None
+
+    # Create image in pixels
+    if pixelgrid is None:
+        pixelgrid = get_pixelgrid(X, Y, pixelsize)
+    xmin, xmax, ymin, ymax, i, j, image = pixelgrid
+    image[j, i] = val
+
+    # Data range, used as a guess or directly as vmin/vmax
+    val_min = np.nanmin(val)
+    val_max = np.nanmax(val)
 
     if INTERACTIVE == True:
         contour_offset = input("Enter value of minimum isophote [default: 0.20]: ")
@@ -102,58 +157,47 @@ def plot_line(
     else:
         contour_offset = 0.20
 
-    # Do not produce empty plots
-    if len(np.where(np.isnan(val) == True)[0]) == len(val):
-        return None
-
-    if INTERACTIVE == True:
-        # Interactive Mode: Prompt for values of vmin/vmax, show plot and iterate until you are satisfied
+    def prompt_vminmax():
+        # Interactive Mode: Prompt for values of vmin/vmax
         inp = input(
             " Enter vmin,vmax for "
             + lineIdentifier
             + "! Good guess: "
-            + "[{:.2f},{:.2f}]".format(np.nanmin(val), np.nanmax(val))
+            + "[{:.2f},{:.2f}]".format(val_min, val_max)
             + "; Previously chosen: ["
             + str(vminmax[0])
             + ","
             + str(vminmax[1])
             + "]; New values: "
         )
-        if inp == "":
-            # Hit ENTER to keep previously selected values
-            vmin = vminmax[0]
-            vmax = vminmax[1]
-        else:
-            # Use input values for vmin,vmax and save them for later
-            vmin = float(inp.split(",")[0])
-            vmax = float(inp.split(",")[1])
-            vminmax[0] = vmin
-            vminmax[1] = vmax
-    else:
-        if SAVE_AFTER_INTERACTIVE == False:
-            # Determine vmin/vmax automatically, if called from within the pipeline
-            vmin = np.nanmin(val)
-            vmax = np.nanmax(val)
-        elif SAVE_AFTER_INTERACTIVE == True:
-            # Use previously selected values, redo plot and save!
-            vmin = vminmax[0]
-            vmax = vminmax[1]
+        if inp != "":
+            # Use input values for vmin,vmax and save them for later; hit ENTER to keep previously selected values
+            vminmax[0] = float(inp.split(",")[0])
+            vminmax[1] = float(inp.split(",")[1])
+        return vminmax[0], vminmax[1]
 
-    # Create image in pixels
-    xmin = np.nanmin(X) - 6
-    xmax = np.nanmax(X) + 6
-    ymin = np.nanmin(Y) - 6
-    ymax = np.nanmax(Y) + 6
-    npixels_x = int(np.round((xmax - xmin) / pixelsize) + 1)
-    npixels_y = int(np.round((ymax - ymin) / pixelsize) + 1)
-    i = np.array(np.round((X - xmin) / pixelsize), dtype=np.int32)
-    j = np.array(np.round((Y - ymin) / pixelsize), dtype=np.int32)
-    image = np.full((npixels_x, npixels_y), np.nan)
-    image[i, j] = val
+    if INTERACTIVE == True:
+        vmin, vmax = prompt_vminmax()
+    elif SAVE_AFTER_INTERACTIVE == False:
+        # Determine vmin/vmax automatically, if called from within the pipeline
+        vmin = val_min
+        vmax = val_max
+    elif SAVE_AFTER_INTERACTIVE == True:
+        # Use previously selected values, redo plot and save!
+        vmin = vminmax[0]
+        vmax = vminmax[1]
+
+    # Setup main figure, or clear the figure that is reused for all lines
+    if fig is None:
+        fig, grid = setup_figure()
+    else:
+        grid[0].cla()
+        grid.cbar_axes[0].cla()
 
     # Plot map and colorbar
-    image = grid[0].imshow(
-        np.rot90(image),
+    image_artist = grid[0].imshow(
+        image,
+        origin="lower",
         cmap="sauron",
         interpolation=None,
         vmin=vmin,
@@ -165,7 +209,7 @@ def plot_line(
             ymax + pixelsize / 2,
         ],
     )
-    grid.cbar_axes[0].colorbar(image)
+    grid.cbar_axes[0].colorbar(image_artist)
 
     # # Plot contours
     # XY_Triangulation = Triangulation(X-pixelsize/2, Y-pixelsize/2)                      # Create a mesh from a Delaunay triangulation
@@ -175,24 +219,24 @@ def plot_line(
 
     # Label vmin and vmax
     if lineIdentifier.split("_")[-1] in ["V", "S"]:
-        grid[0].text(
-            0.985,
-            0.008,
-            r"{:.0f}".format(vmin).replace("-", r"- ")
+        label_format = r"{:.0f}"
+    elif lineIdentifier.split("_")[-1] in ["F", "A"]:
+        label_format = r"{:.2f}"
+    else:
+        label_format = None
+
+    def vminmax_label(vmin, vmax):
+        return (
+            label_format.format(vmin).replace("-", r"- ")
             + r" / "
-            + r"{:.0f}".format(vmax),
-            horizontalalignment="right",
-            verticalalignment="bottom",
-            transform=grid[0].transAxes,
-            fontsize=16,
+            + label_format.format(vmax)
         )
-    if lineIdentifier.split("_")[-1] in ["F", "A"]:
-        grid[0].text(
+
+    if label_format is not None:
+        vminmax_text = grid[0].text(
             0.985,
             0.008,
-            r"{:.2f}".format(vmin).replace("-", r"- ")
-            + r" / "
-            + r"{:.2f}".format(vmax),
+            vminmax_label(vmin, vmax),
             horizontalalignment="right",
             verticalalignment="bottom",
             transform=grid[0].transAxes,
@@ -309,90 +353,96 @@ def plot_line(
         direction="in", which="both", bottom=True, top=True, left=True, right=True
     )  # Ticks inside of plot
 
-    if INTERACTIVE == True:
-        # Display preview of plot in INTERACTIVE-mode and decide if another iteration is necessary
-        plt.show()
+    # Display preview of plot in INTERACTIVE-mode and only update the colour
+    # limits until you are satisfied
+    while INTERACTIVE == True:
+        # Show the figure again if its window has been closed
+        if not plt.fignum_exists(fig.number):
+            reshow_figure(fig)
+        plt.show(block=False)
+        plt.pause(0.1)
         inp = input(" Save plot [y/n]? ")
         print("")
         if inp == "y" or inp == "Y" or inp == "yes" or inp == "YES":
-            # To save plot with previously selected values:
-            #   Call function again with previously chosen values for vmin and vmax, then save figure to file without prompting again
-            plt.close()
-            fig.clf()
-            plot_line(
-                val,
-                LEVEL,
-                FROM_PIPELINE,
-                False,
-                True,
-                lineIdentifier,
-                vminmax,
-                contour_offset_saved,
-                X,
-                Y,
-                FLUX,
-                pixelsize,
-                outdir,
-                rootname,
-            )
-
+            # Save figure to file with the currently chosen values for vmin and vmax
+            break
         elif inp == "n" or inp == "N" or inp == "no" or inp == "NO":
-            # To iterate and prompt again:
-            #   Call function again with new values for vmin and vmax (offer previously chosen values as default), then prompt again
-            plt.close()
-            fig.clf()
-            plot_line(
-                val,
-                LEVEL,
-                FROM_PIPELINE,
-                True,
-                False,
-                lineIdentifier,
-                vminmax,
-                contour_offset_saved,
-                X,
-                Y,
-                FLUX,
-                pixelsize,
-                outdir,
-                rootname,
-            )
+            # Prompt again for vmin and vmax (offer previously chosen values as default)
+            pass
         else:
             print(
                 "You should have hit 'y' or 'n'. I guess you want to try another time?!"
             )
-            # To iterate and prompt again:
-            #   Call function again with new values for vmin and vmax (offer previously chosen values as default), then prompt again
-            plt.close()
-            fig.clf()
+        vmin, vmax = prompt_vminmax()
+        # Replace the norm at once; set_clim() would update vmin and vmax one
+        # after the other and the colorbar might swap them in between
+        image_artist.set_norm(Normalize(vmin=vmin, vmax=vmax))
+        grid.cbar_axes[0].yaxis.set_ticks([])
+        if label_format is not None:
+            vminmax_text.set_text(vminmax_label(vmin, vmax))
+        fig.canvas.draw_idle()
+
+    # Save plot
+    fig.savefig(
+        os.path.join(outdir, rootname)
+        + "_gas-"
+        + lineIdentifier
+        + "_"
+        + LEVEL
+        + ".pdf",
+    )
+
+    if INTERACTIVE == True:
+        plt.close(fig)
+
+
+def workerPlotLine(
+    inQueue, outQueue, LEVEL, vminmax, pixelsize, outdir, rootname, pixelgrid
+):
+    """
+    Defines the worker process of the parallelisation with multiprocessing.Queue
+    and multiprocessing.Process. Everything that is the same for all lines is
+    passed once when the process is created, the queue only carries the data
+    and the identifier of each line.
+    """
+    # Workers do not necessarily inherit the rcParams of the parent process
+    setup_plot(usetex=True)
+
+    # Setup one figure per worker and reuse it for all lines it receives
+    fig, grid = setup_figure()
+
+    for data, line in iter(inQueue.get, "STOP"):
+        # Always report back, so that the main process does not wait forever
+        # for a map that failed
+        try:
+            # X, Y and FLUX are not needed, as the pixelgrid is passed in
             plot_line(
-                val,
+                data,
                 LEVEL,
-                FROM_PIPELINE,
                 True,
                 False,
-                lineIdentifier,
+                False,
+                line,
                 vminmax,
-                contour_offset_saved,
-                X,
-                Y,
-                FLUX,
+                0.20,
+                None,
+                None,
+                None,
                 pixelsize,
                 outdir,
                 rootname,
+                pixelgrid,
+                fig,
+                grid,
             )
-    else:
-        # Save plot in non-interactive mode or when called from within the pipeline
-        plt.savefig(
-            os.path.join(outdir, rootname)
-            + "_gas-"
-            + lineIdentifier
-            + "_"
-            + LEVEL
-            + ".pdf",
-            bbox_inches="tight",
-            pad_inches=0.3,
-        )
+            error = None
+        except Exception as e:
+            error = repr(e)
+
+        outQueue.put((line, error))
+
+    fig.clf()
+    plt.close()
 
 
 def plotMaps(
@@ -404,54 +454,71 @@ def plotMaps(
     SAVE_AFTER_INTERACTIVE=False,
     AoNThreshold=4,
     lineIdentifier=None,
+    NCPU=1,
 ):
     runname = outdir
     rootname = outdir.rstrip("/").split("/")[-1]
 
     # Construct a mask for defunct spaxels
-    mask = fits.open(os.path.join(outdir, rootname) + "_mask.fits")[1].data.MASK_DEFUNCT
-    maskedSpaxel = np.array(mask, dtype=bool)
+    with fits.open(
+        os.path.join(outdir, rootname) + "_mask.fits", memmap=True
+    ) as mask_hdu:
+        maskedSpaxel = np.array(mask_hdu[1].data.MASK_DEFUNCT, dtype=bool)
 
     # Read bintable
-    table_hdu = fits.open(os.path.join(outdir, rootname) + "_table.fits")
-    X = np.array(table_hdu[1].data.X[~maskedSpaxel]) * -1
-    Y = np.array(table_hdu[1].data.Y[~maskedSpaxel])
-    FLUX = np.array(table_hdu[1].data.FLUX[~maskedSpaxel])
-    binNum_long = np.array(table_hdu[1].data.BIN_ID[~maskedSpaxel])
-    ubins = np.unique(np.abs(binNum_long))
-    pixelsize = table_hdu[0].header["PIXSIZE"]
+    with fits.open(
+        os.path.join(outdir, rootname) + "_table.fits", memmap=True
+    ) as table_hdu:
+        X = table_hdu[1].data.X[~maskedSpaxel] * -1
+        Y = table_hdu[1].data.Y[~maskedSpaxel]
+        FLUX = table_hdu[1].data.FLUX[~maskedSpaxel]
+        binNum_long = table_hdu[1].data.BIN_ID[~maskedSpaxel]
+        pixelsize = table_hdu[0].header["PIXSIZE"]
+    ubins, idxConvert = np.unique(np.abs(binNum_long), return_inverse=True)
 
     # Check spatial coordinates
-    if len(np.where(np.logical_or(X == 0.0, np.isnan(X) == True))[0]) == len(X):
+    if np.all((X == 0.0) | np.isnan(X)):
         print(
             "All X-coordinates are 0.0 or np.nan. Plotting maps will not work without reasonable spatial information!"
         )
-    if len(np.where(np.logical_or(Y == 0.0, np.isnan(Y) == True))[0]) == len(Y):
+    if np.all((Y == 0.0) | np.isnan(Y)):
         print(
             "All Y-coordinates are 0.0 or np.nan. Plotting maps will not work without reasonable spatial information!\n"
         )
 
     # Read Gandalf results
-    if LEVEL == "SPAXEL":
-        results = fits.open(os.path.join(outdir, rootname) + "_gas_SPAXEL.fits")[
-            1
-        ].data[~maskedSpaxel]
-        results2 = Table.read(
-            os.path.join(outdir, rootname) + "_gas_SPAXEL.fits"
-        )  # Need the column names
-    elif LEVEL == "BIN":
-        results = fits.open(os.path.join(outdir, rootname) + "_gas_BIN.fits")[1].data
-        results2 = Table.read(os.path.join(outdir, rootname) + "_gas_BIN.fits")
+    with fits.open(
+        os.path.join(outdir, rootname) + "_gas_" + LEVEL + ".fits", memmap=True
+    ) as results_hdu:
+        if LEVEL == "SPAXEL":
+            results = results_hdu[1].data[~maskedSpaxel]
+        elif LEVEL == "BIN":
+            results = results_hdu[1].data.copy()
+
+    # Remove results below the AoN threshold and failed fits. This is done
+    # before converting to the long version, so each bin is masked only once.
+    if FROM_PIPELINE == False:
+        lines = [lineIdentifier]
+    elif FROM_PIPELINE == True:
+        lines = [
+            line
+            for line in results.names
+            if line[-3:] != "AON" and line not in ["EBmV_0", "EBmV_1"]
+        ]
+    for line in lines:
+        data = results[line]
+        data_aon = results[line[:-2] + "_AON"]
+        data[(data_aon < AoNThreshold) | (data == -1)] = np.nan
+
     # Convert results to long version
     if LEVEL == "BIN":
-        _, idxConvert = np.unique(np.abs(binNum_long), return_inverse=True)
         results = results[idxConvert]
 
     #     ####### Add ability to print maps files to fits file
 
     #     primary_hdu = fits.PrimaryHDU()
     #     hdu1 = fits.HDUList([primary_hdu])
-    #     names = results2.colnames # This should be a list of ALL the column names
+    #     names = results.names # This should be a list of ALL the column names
     #     fluxnames = names[0::5] # splitting them into the various types of map
     #     ampnames = names[1::5]
     #     velnames = names[2::5]
@@ -484,12 +551,14 @@ def plotMaps(
         os.mkdir(os.path.join(outdir, "maps/"))
     outdir = os.path.join(outdir, "maps/")
 
+    # Create image in pixels; the same grid is used for all maps
+    pixelgrid = get_pixelgrid(X, Y, pixelsize)
+
+    # Set plot parameters once for all maps
+    setup_plot(usetex=True)
+
     if FROM_PIPELINE == False:
         data = results[lineIdentifier]
-        data_aon = results[lineIdentifier[:-2] + "_AON"]
-
-        data[np.where(data_aon < AoNThreshold)[0]] = np.nan
-        data[np.where(data == -1)[0]] = np.nan
 
         if lineIdentifier.split("_")[-1] == "V":
             data = data - np.nanmedian(data)
@@ -509,21 +578,78 @@ def plotMaps(
             pixelsize,
             outdir,
             rootname,
+            pixelgrid,
         )
 
-    elif FROM_PIPELINE == True:
-        # Iterate over all lines
-        for line in results.names:
-            if line[-3:] == "AON":
-                continue
-            if line in ["EBmV_0", "EBmV_1"]:
+    elif FROM_PIPELINE == True and NCPU > 1:
+        # Create Queues
+        inQueue = Queue()
+        outQueue = Queue()
+
+        # Create worker processes
+        ps = [
+            Process(
+                target=workerPlotLine,
+                args=(
+                    inQueue,
+                    outQueue,
+                    LEVEL,
+                    vminmax,
+                    pixelsize,
+                    outdir,
+                    rootname,
+                    pixelgrid,
+                ),
+            )
+            for _ in range(NCPU)
+        ]
+
+        # Start worker processes
+        for p in ps:
+            p.start()
+
+        # Fill the queue
+        nlines = 0
+        for line in lines:
+            data = results[line]
+
+            # Skip lines without any valid data
+            if np.all(np.isnan(data)):
                 continue
 
+            if line.split("_")[-1] == "V":
+                data = data - np.nanmedian(data)
+
+            inQueue.put((data, line))
+            nlines += 1
+
+        # Wait until all maps are saved
+        plot_results = [outQueue.get() for _ in range(nlines)]
+
+        # send stop signal to stop iteration
+        for _ in range(NCPU):
+            inQueue.put("STOP")
+
+        # stop processes
+        for p in ps:
+            p.join()
+
+        # Check for exceptions which occurred while plotting
+        for line, error in plot_results:
+            if error is not None:
+                print("Failed to plot the map of " + line + ": " + error)
+
+    elif FROM_PIPELINE == True:
+        # Setup one figure and reuse it for the maps of all lines
+        fig, grid = setup_figure()
+
+        # Iterate over all lines
+        for line in lines:
             data = results[line]
-            data_aon = results[line[:-2] + "_AON"]
 
-            data[np.where(data_aon < AoNThreshold)[0]] = np.nan
-            data[np.where(data == -1)[0]] = np.nan
+            # Skip lines without any valid data
+            if np.all(np.isnan(data)):
+                continue
 
             if line.split("_")[-1] == "V":
                 data = data - np.nanmedian(data)
@@ -543,8 +669,14 @@ def plotMaps(
                 pixelsize,
                 outdir,
                 rootname,
+                pixelgrid,
+                fig,
+                grid,
             )
 
+        fig.clf()
+        plt.close()
+
 
 # ==============================================================================
 # If plot routine is run independently of pipeline
@@ -570,7 +702,7 @@ def main(args=None):
         "--line",
         dest="line",
         type="string",
-        help="Identifier of the emission line to be plotted, as specified in extension 1 of '*_gas_*.fits'.",
+        help="Identifier of the emission line to be plotted interactively, as specified in extension 1 of '*_gas_*.fits'. If not set, the maps of all lines are saved without prompting.",
     )
     parser.add_option(
         "-a",
@@ -579,19 +711,36 @@ def main(args=None):
         type="int",
         help="Minimum amplitude-over-noise ratio of data to be plotted",
     )
+    parser.add_option(
+        "-j",
+        "--jobs",
+        dest="jobs",
+        type="int",
+        default=1,
+        help="Number of processes used to plot the maps of all lines.",
+    )
     (options, args) = parser.parse_args()
 
     if options.runname[-1] != "/":
         options.runname = options.runname + "/"
 
-    plotMaps(
-        options.runname,
-        options.LEVEL,
-        False,
-        INTERACTIVE=True,
-        AoNThreshold=options.aon_threshold,
-        lineIdentifier=options.line,
-    )
+    if options.line is None:
+        plotMaps(
+            options.runname,
+            options.LEVEL,
+            True,
+            AoNThreshold=options.aon_threshold,
+            NCPU=options.jobs,
+        )
+    else:
+        plotMaps(
+            options.runname,
+            options.LEVEL,
+            False,
+            INTERACTIVE=True,
+            AoNThreshold=options.aon_threshold,
+            lineIdentifier=options.line,
+        )
 
 
 if __name__ == "__main__":
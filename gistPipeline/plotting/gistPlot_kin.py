@@ -9,6 +9,7 @@ from astropy.io import fits
 
 warnings.filterwarnings("ignore")
 import matplotlib.pyplot as plt
+from matplotlib.colors import Normalize
 from matplotlib.ticker import FuncFormatter, MultipleLocator
 from matplotlib.tri import TriAnalyzer, Triangulation
 from mpl_toolkits.axes_grid1 import AxesGrid
@@ -54,6 +55,17 @@ def setup_plot(usetex=False):
     # plt.rcParams['text.latex.preamble'] = [r'\boldmath']
 
 
+def reshow_figure(fig):
+    """
+    Attach a figure whose window has been closed to a new window, so that it
+    can be shown again in the interactive mode.
+    """
+    manager = plt.figure(figsize=fig.get_size_inches()).canvas.manager
+    manager.canvas.figure = fig
+    fig.set_canvas(manager.canvas)
+    fig.number = manager.num
+
+
 def plotMaps(
     flag,
     outdir,
@@ -64,52 +76,60 @@ def plotMaps(
 ):
     labellist = ["V", "SIGMA", "H3", "H4"]
 
-    runname = outdir
     rootname = outdir.rstrip("/").split("/")[-1]
 
     # Read bintable
-    table_hdu = fits.open(os.path.join(outdir, rootname) + "_table.fits")
-    idx_inside = np.where(table_hdu[1].data.BIN_ID >= 0)[0]
-    X = np.array(table_hdu[1].data.X[idx_inside]) * -1
-    Y = np.array(table_hdu[1].data.Y[idx_inside])
-    FLUX = np.array(table_hdu[1].data.FLUX[idx_inside])
-    binNum_long = np.array(table_hdu[1].data.BIN_ID[idx_inside])
-    print(os.path.join(outdir, rootname) + "_table.fits")
-    print(len(table_hdu[1].data.BIN_ID))
-    ubins = np.unique(np.abs(np.array(table_hdu[1].data.BIN_ID)))
-    pixelsize = table_hdu[0].header["PIXSIZE"]
+    with fits.open(
+        os.path.join(outdir, rootname) + "_table.fits", memmap=True
+    ) as table_hdu:
+        idx_inside = np.where(table_hdu[1].data.BIN_ID >= 0)[0]
+        X = table_hdu[1].data.X[idx_inside] * -1
+        Y = table_hdu[1].data.Y[idx_inside]
+        FLUX = table_hdu[1].data.FLUX[idx_inside]
+        binNum_long = table_hdu[1].data.BIN_ID[idx_inside]
+        ubins, idxConvert = np.unique(np.abs(binNum_long), return_inverse=True)
+        print(os.path.join(outdir, rootname) + "_table.fits")
+        print(len(table_hdu[1].data.BIN_ID))
+        pixelsize = table_hdu[0].header["PIXSIZE"]
 
     # Check spatial coordinates
-    if len(np.where(np.logical_or(X == 0.0, np.isnan(X) == True))[0]) == len(X):
+    if np.all((X == 0.0) | np.isnan(X)):
         print(
             "All X-coordinates are 0.0 or np.nan. Plotting maps will not work without reasonable spatial information!"
         )
-    if len(np.where(np.logical_or(Y == 0.0, np.isnan(Y) == True))[0]) == len(Y):
+    if np.all((Y == 0.0) | np.isnan(Y)):
         print(
             "All Y-coordinates are 0.0 or np.nan. Plotting maps will not work without reasonable spatial information!\n"
         )
 
     # Read Results
     if flag == "KIN":
-        hdu = fits.open(os.path.join(outdir, rootname) + "_kin.fits")
+        filename = os.path.join(outdir, rootname) + "_kin.fits"
     elif flag == "SFH":
-        hdu = fits.open(os.path.join(outdir, rootname) + "_sfh.fits")
+        filename = os.path.join(outdir, rootname) + "_sfh.fits"
     result = np.zeros((len(ubins), 4))
-    result[:, 0] = np.array(hdu[1].data.V)
-    result[:, 1] = np.array(hdu[1].data.SIGMA)
-    if hasattr(hdu[1].data, "H3"):
-        result[:, 2] = np.array(hdu[1].data.H3)
-    if hasattr(hdu[1].data, "H4"):
-        result[:, 3] = np.array(hdu[1].data.H4)
+    with fits.open(filename, memmap=True) as hdu:
+        result[:, 0] = hdu[1].data.V
+        result[:, 1] = hdu[1].data.SIGMA
+        cols = hdu[1].columns.names
+        has_h3 = "H3" in cols
+        has_h4 = "H4" in cols
+        if has_h3:
+            result[:, 2] = hdu[1].data.H3
+        if has_h4:
+            result[:, 3] = hdu[1].data.H4
+
+    # Only plot the moments that are present in the results
+    panels = [0, 1]
+    if has_h3:
+        panels.append(2)
+    if has_h4:
+        panels.append(3)
+    nrows = 1 if len(panels) == 2 else 2
 
     # Convert results to long version
-    result_long = np.zeros((len(binNum_long), result.shape[1]))
-    result_long[:, :] = np.nan
     print("binNum_long", len(binNum_long))
-    for i in range(len(ubins)):
-        idx = np.where(ubins[i] == np.abs(binNum_long))[0]
-        result_long[idx, :] = result[i, :]
-    result = result_long
+    result = result[idxConvert, :]
     result[:, 0] = result[:, 0] - np.nanmedian(result[:, 0])
 
     # Create/Set output directory
@@ -119,11 +139,11 @@ def plotMaps(
 
     # Setup main figure
     setup_plot(usetex=False)
-    fig = plt.figure(figsize=(10, 10))
+    fig = plt.figure(figsize=(10, 5 * nrows))
     grid = AxesGrid(
         fig,
         111,
-        nrows_ncols=(2, 2),
+        nrows_ncols=(nrows, 2),
         axes_pad=0.0,
         share_all=True,
         label_mode="L",
@@ -132,71 +152,102 @@ def plotMaps(
         cbar_size="4%",
     )
 
-    if INTERACTIVE == True:
+    def prompt_contour_offset(contour_offset_saved):
         contour_offset = input(
             "Enter value of minimum isophote [Previously: {:.2f}]: ".format(
                 contour_offset_saved
             )
         )
         if contour_offset == "":
-            contour_offset = contour_offset_saved
-        else:
-            contour_offset = float(contour_offset)
+            return contour_offset_saved
+        return float(contour_offset)
+
+    def prompt_vminmax(iterate):
+        # Interactive Mode: Prompt for values of vmin/vmax
+        inp = input(
+            " Enter vmin,vmax for "
+            + labellist[iterate]
+            + "! Good guess: "
+            + "[{:.2f},{:.2f}]".format(result_min[iterate], result_max[iterate])
+            + "; Previously chosen: ["
+            + str(vminmax[iterate, 0])
+            + ","
+            + str(vminmax[iterate, 1])
+            + "]; New values: "
+        )
+        if inp != "":
+            # Use input values for vmin,vmax and save them for later; hit ENTER to keep previously selected values
+            vminmax[iterate, 0] = float(inp.split(",")[0])
+            vminmax[iterate, 1] = float(inp.split(",")[1])
+        return vminmax[iterate, 0], vminmax[iterate, 1]
+
+    def vminmax_label(iterate, vmin, vmax):
+        label_format = r"{:.0f}" if iterate in [0, 1] else r"{:.2f}"
+        return (
+            label_format.format(vmin).replace("-", r"- ")
+            + r" / "
+            + label_format.format(vmax)
+        )
+
+    if INTERACTIVE == True:
+        contour_offset = prompt_contour_offset(contour_offset_saved)
     else:
         contour_offset = contour_offset_saved
 
-    for iterate in range(0, 4):
+    # Prepare contours; the triangulation is identical for all panels
+    XY_Triangulation = Triangulation(
+        X - pixelsize / 2, Y - pixelsize / 2
+    )  # Create a mesh from a Delaunay triangulation
+    XY_Triangulation.set_mask(
+        TriAnalyzer(XY_Triangulation).get_flat_tri_mask(0.01)
+    )  # Remove bad triangles at the border of the field-of-view
+    logFLUX = np.log10(FLUX)
+    logFLUX_min, logFLUX_max = np.nanmin(logFLUX), np.nanmax(logFLUX)
+    levels = np.arange(logFLUX_min + contour_offset, logFLUX_max, 0.2)
+
+    # Create image in pixels
+    xmin = np.nanmin(X) - 6
+    xmax = np.nanmax(X) + 6
+    ymin = np.nanmin(Y) - 6
+    ymax = np.nanmax(Y) + 6
+    npixels_x = int(np.round((xmax - xmin) / pixelsize) + 1)
+    npixels_y = int(np.round((ymax - ymin) / pixelsize) + 1)
+    i = np.rint((X - xmin) / pixelsize).astype(np.intp)
+    j = np.rint((Y - ymin) / pixelsize).astype(np.intp)
+    image = np.full((npixels_y, npixels_x), np.nan)
+
+    # Data range of all panels, used as a guess or directly as vmin/vmax
+    result_min = np.nanmin(result, axis=0)
+    result_max = np.nanmax(result, axis=0)
+
+    # Keep the artists that change between the iterations of the interactive mode
+    images = []
+    vminmax_texts = []
+    contours = []
+
+    for ax_idx, iterate in enumerate(panels):
         # Prepare main plot
         val = result[:, iterate]
 
         if INTERACTIVE == True:
-            # Interactive Mode: Prompt for values of vmin/vmax, show plot and iterate until you are satisfied
-            inp = input(
-                " Enter vmin,vmax for "
-                + labellist[iterate]
-                + "! Good guess: "
-                + "[{:.2f},{:.2f}]".format(np.nanmin(val), np.nanmax(val))
-                + "; Previously chosen: ["
-                + str(vminmax[iterate, 0])
-                + ","
-                + str(vminmax[iterate, 1])
-                + "]; New values: "
-            )
-            if inp == "":
-                # Hit ENTER to keep previously selected values
-                vmin = vminmax[iterate, 0]
-                vmax = vminmax[iterate, 1]
-            else:
-                # Use input values for vmin,vmax and save them for later
-                vmin = float(inp.split(",")[0])
-                vmax = float(inp.split(",")[1])
-                vminmax[iterate, 0] = vmin
-                vminmax[iterate, 1] = vmax
+            vmin, vmax = prompt_vminmax(iterate)
         else:
             if SAVE_AFTER_INTERACTIVE == False:
                 # Determine vmin/vmax automatically, if called from within the pipeline
-                vmin = np.nanmin(val)
-                vmax = np.nanmax(val)
+                vmin = result_min[iterate]
+                vmax = result_max[iterate]
             elif SAVE_AFTER_INTERACTIVE == True:
                 # Use previously selected values, redo plot and save!
                 vmin = vminmax[iterate, 0]
                 vmax = vminmax[iterate, 1]
 
-        # Create image in pixels
-        xmin = np.nanmin(X) - 6
-        xmax = np.nanmax(X) + 6
-        ymin = np.nanmin(Y) - 6
-        ymax = np.nanmax(Y) + 6
-        npixels_x = int(np.round((xmax - xmin) / pixelsize) + 1)
-        npixels_y = int(np.round((ymax - ymin) / pixelsize) + 1)
-        i = np.array(np.round((X - xmin) / pixelsize), dtype=np.int32)
-        j = np.array(np.round((Y - ymin) / pixelsize), dtype=np.int32)
-        image = np.full((npixels_x, npixels_y), np.nan)
-        image[i, j] = val
+        # Fill image; all panels write to the same pixels, so it can be reused
+        image[j, i] = val
 
         # Plot map and colorbar
-        im = grid[iterate].imshow(
-            np.rot90(image),
+        im = grid[ax_idx].imshow(
+            image,
+            origin="lower",
             cmap="RdBu",
             interpolation=None,
             vmin=vmin,
@@ -208,49 +259,29 @@ def plotMaps(
                 ymax + pixelsize / 2,
             ],
         )
-        grid.cbar_axes[iterate].colorbar(im)
+        grid.cbar_axes[ax_idx].colorbar(im)
+        images.append(im)
 
         # Plot contours
-        XY_Triangulation = Triangulation(
-            X - pixelsize / 2, Y - pixelsize / 2
-        )  # Create a mesh from a Delaunay triangulation
-        XY_Triangulation.set_mask(
-            TriAnalyzer(XY_Triangulation).get_flat_tri_mask(0.01)
-        )  # Remove bad triangles at the border of the field-of-view
-        levels = np.arange(
-            np.min(np.log10(FLUX)) + contour_offset, np.max(np.log10(FLUX)), 0.2
-        )
-        grid[iterate].tricontour(
-            XY_Triangulation, np.log10(FLUX), levels=levels, linewidths=1, colors="k"
+        contours.append(
+            grid[ax_idx].tricontour(
+                XY_Triangulation, logFLUX, levels=levels, linewidths=1, colors="k"
+            )
         )
 
         # Label vmin and vmax
-        if iterate in [0, 1]:
-            grid[iterate].text(
-                0.985,
-                0.008,
-                r"{:.0f}".format(vmin).replace("-", r"- ")
-                + r" / "
-                + r"{:.0f}".format(vmax),
-                horizontalalignment="right",
-                fontweight="bold",
-                verticalalignment="bottom",
-                transform=grid[iterate].transAxes,
-                fontsize=16,
-            )
-        elif iterate in [2, 3]:
-            grid[iterate].text(
+        vminmax_texts.append(
+            grid[ax_idx].text(
                 0.985,
                 0.008,
-                r"{:.2f}".format(vmin).replace("-", r"- ")
-                + r" / "
-                + r"{:.2f}".format(vmax),
+                vminmax_label(iterate, vmin, vmax),
                 horizontalalignment="right",
                 fontweight="bold",
                 verticalalignment="bottom",
-                transform=grid[iterate].transAxes,
+                transform=grid[ax_idx].transAxes,
                 fontsize=16,
             )
+        )
 
     # Remove ticks and labels from colorbar
     for cax in grid.cbar_axes:
@@ -286,118 +317,118 @@ def plotMaps(
         transform=grid[1].transAxes,
         fontsize=16,
     )
-    grid[2].text(
-        0.02,
-        0.98,
-        r"h3",
-        horizontalalignment="left",
-        verticalalignment="top",
-        transform=grid[2].transAxes,
-        fontsize=16,
-        fontweight="bold",
-    )
-    grid[3].text(
-        0.02,
-        0.98,
-        r"h4",
-        horizontalalignment="left",
-        verticalalignment="top",
-        transform=grid[3].transAxes,
-        fontsize=16,
-        fontweight="bold",
-    )
+    if has_h3:
+        grid[panels.index(2)].text(
+            0.02,
+            0.98,
+            r"h3",
+            horizontalalignment="left",
+            verticalalignment="top",
+            transform=grid[panels.index(2)].transAxes,
+            fontsize=16,
+            fontweight="bold",
+        )
+    if has_h4:
+        grid[panels.index(3)].text(
+            0.02,
+            0.98,
+            r"h4",
+            horizontalalignment="left",
+            verticalalignment="top",
+            transform=grid[panels.index(3)].transAxes,
+            fontsize=16,
+            fontweight="bold",
+        )
+
+    # Hide the unused panel if only one of h3 and h4 is present, and show the
+    # x tick labels of the panel above it instead
+    xlabel_axes = grid.axes_row[-1]
+    if len(panels) == 3:
+        grid[3].set_visible(False)
+        grid[1].axis["bottom"].toggle(ticklabels=True, label=True)
+        xlabel_axes = [grid[2], grid[1]]
 
     # Set xlabel and ylabel
-    grid[0].set_ylabel(r"$\Delta \delta$ [arcsec]", fontweight="bold")
-    grid[2].set_ylabel(r"$\Delta \delta$ [arcsec]", fontweight="bold")
-    grid[2].set_xlabel(r"$\Delta \alpha$ [arcsec]", fontweight="bold")
-    grid[3].set_xlabel(r"$\Delta \alpha$ [arcsec]", fontweight="bold")
+    for ax in grid.axes_column[0]:
+        ax.set_ylabel(r"$\Delta \delta$ [arcsec]", fontweight="bold")
+    for ax in xlabel_axes:
+        ax.set_xlabel(r"$\Delta \alpha$ [arcsec]", fontweight="bold")
 
     # Fix minus sign in ticklabels
     grid[0].xaxis.set_major_formatter(FuncFormatter(TicklabelFormatter))
     grid[0].yaxis.set_major_formatter(FuncFormatter(TicklabelFormatter))
 
     # Invert x-axis
-    grid[0].invert_xaxis()
-    grid[1].invert_xaxis()
-    grid[2].invert_xaxis()
-    grid[3].invert_xaxis()
+    for ax in grid:
+        ax.invert_xaxis()
 
     # Set tick frequency and parameters
-    for iterate in range(0, 4):
-        grid[iterate].xaxis.set_major_locator(MultipleLocator(10))
-        grid[iterate].yaxis.set_major_locator(
-            MultipleLocator(10)
-        )  # Major tick every 10 units
-        grid[iterate].xaxis.set_minor_locator(MultipleLocator(1))
-        grid[iterate].yaxis.set_minor_locator(
-            MultipleLocator(1)
-        )  # Minor tick every 1 units
-        grid[iterate].tick_params(
+    for ax in grid:
+        ax.xaxis.set_major_locator(MultipleLocator(10))
+        ax.yaxis.set_major_locator(MultipleLocator(10))  # Major tick every 10 units
+        ax.xaxis.set_minor_locator(MultipleLocator(1))
+        ax.yaxis.set_minor_locator(MultipleLocator(1))  # Minor tick every 1 units
+        ax.tick_params(
             direction="in", which="both", bottom=True, top=True, left=True, right=True
         )  # Ticks inside of plot
 
-    if INTERACTIVE == True:
-        # Display preview of plot in INTERACTIVE-mode and decide if another iteration is necessary
-        plt.show()
+    # Display preview of plot in INTERACTIVE-mode and only update the colour
+    # limits and contours until you are satisfied
+    while INTERACTIVE == True:
+        # Show the figure again if its window has been closed
+        if not plt.fignum_exists(fig.number):
+            reshow_figure(fig)
+        plt.show(block=False)
+        plt.pause(0.1)
         inp = input(" Save plot [y/n]? ")
         print("")
         if inp == "y" or inp == "Y" or inp == "yes" or inp == "YES":
-            # To save plot with previously selected values:
-            #   Call function again with previously chosen values for vmin and vmax, then save figure to file without prompting again
-            plotMaps(
-                flag,
-                runname,
-                INTERACTIVE=False,
-                vminmax=vminmax,
-                contour_offset_saved=contour_offset,
-                SAVE_AFTER_INTERACTIVE=True,
-            )
+            # Save figure to file with the currently chosen values for vmin and vmax
+            break
         elif inp == "n" or inp == "N" or inp == "no" or inp == "NO":
-            # To iterate and prompt again:
-            #   Call function again with new values for vmin and vmax (offer previously chosen values as default), then prompt again
-            plotMaps(
-                flag,
-                runname,
-                INTERACTIVE=True,
-                vminmax=vminmax,
-                contour_offset_saved=contour_offset,
-                SAVE_AFTER_INTERACTIVE=False,
-            )
+            # Prompt again for vmin and vmax (offer previously chosen values as default)
+            pass
         else:
             print(
                 "You should have hit 'y' or 'n'. I guess you want to try another time?!"
             )
-            # To iterate and prompt again:
-            #   Call function again with new values for vmin and vmax (offer previously chosen values as default), then prompt again
-            plotMaps(
-                flag,
-                runname,
-                INTERACTIVE=True,
-                vminmax=vminmax,
-                contour_offset_saved=contour_offset,
-                SAVE_AFTER_INTERACTIVE=False,
-            )
 
-    else:
-        # Save plot in non-interactive mode or when called from within the pipeline
-        if flag == "KIN":
-            plt.savefig(
-                os.path.join(outdir, rootname) + "_kin.pdf",
-                bbox_inches="tight",
-                pad_inches=0.3,
-            )
-        elif flag == "SFH":
-            plt.savefig(
-                os.path.join(outdir, rootname) + "_sfh-kin.pdf",
-                bbox_inches="tight",
-                pad_inches=0.3,
-            )
+        # Only redo the contours if the minimum isophote changed
+        contour_offset_new = prompt_contour_offset(contour_offset)
+        if contour_offset_new != contour_offset:
+            contour_offset = contour_offset_new
+            levels = np.arange(logFLUX_min + contour_offset, logFLUX_max, 0.2)
+            for ax_idx, contour in enumerate(contours):
+                if hasattr(contour, "remove"):
+                    contour.remove()
+                else:
+                    # matplotlib < 3.8
+                    for collection in contour.collections:
+                        collection.remove()
+                contours[ax_idx] = grid[ax_idx].tricontour(
+                    XY_Triangulation, logFLUX, levels=levels, linewidths=1, colors="k"
+                )
+
+        for ax_idx, iterate in enumerate(panels):
+            vmin, vmax = prompt_vminmax(iterate)
+            # Replace the norm at once; set_clim() would update vmin and vmax
+            # one after the other and the colorbar might swap them in between
+            images[ax_idx].set_norm(Normalize(vmin=vmin, vmax=vmax))
+            grid.cbar_axes[ax_idx].yaxis.set_ticks([])
+            vminmax_texts[ax_idx].set_text(vminmax_label(iterate, vmin, vmax))
+        fig.canvas.draw_idle()
+
+    # Save plot
+    if flag == "KIN":
+        fig.savefig(os.path.join(outdir, rootname) + "_kin.pdf")
+    elif flag == "SFH":
+        fig.savefig(os.path.join(outdir, rootname) + "_sfh-kin.pdf")
 
     fig.clf()
-    plt.close()
+    plt.close(fig)
 
-    return image
+    # Return the image indexed as [x, y], as the image is built as [y, x] for display
+    return image.T
 
 
 # ==============================================================================
@@ -76,19 +76,19 @@ def plotMaps(
     # Read bintable
     table_hdu = fits.open(os.path.join(outdir, rootname) + "_table.fits")
     idx_inside = np.where(table_hdu[1].data.BIN_ID >= 0)[0]
-    X = np.array(table_hdu[1].data.X[idx_inside]) * -1
-    Y = np.array(table_hdu[1].data.Y[idx_inside])
-    FLUX = np.array(table_hdu[1].data.FLUX[idx_inside])
-    binNum_long = np.array(table_hdu[1].data.BIN_ID[idx_inside])
-    ubins = np.unique(np.abs(np.array(table_hdu[1].data.BIN_ID)))
+    X = table_hdu[1].data.X[idx_inside] * -1
+    Y = table_hdu[1].data.Y[idx_inside]
+    FLUX = table_hdu[1].data.FLUX[idx_inside]
+    binNum_long = table_hdu[1].data.BIN_ID[idx_inside]
+    ubins, idxConvert = np.unique(np.abs(binNum_long), return_inverse=True)
     pixelsize = table_hdu[0].header["PIXSIZE"]
 
     # Check spatial coordinates
-    if len(np.where(np.logical_or(X == 0.0, np.isnan(X) == True))[0]) == len(X):
+    if np.all((X == 0.0) | np.isnan(X)):
         print(
             "All X-coordinates are 0.0 or np.nan. Plotting maps will not work without reasonable spatial information!"
         )
-    if len(np.where(np.logical_or(Y == 0.0, np.isnan(Y) == True))[0]) == len(Y):
+    if np.all((Y == 0.0) | np.isnan(Y)):
         print(
             "All Y-coordinates are 0.0 or np.nan. Plotting maps will not work without reasonable spatial information!\n"
         )
@@ -99,12 +99,7 @@ def plotMaps(
     )
 
     # Convert results to long version
-    result_long = np.zeros(len(binNum_long))
-    result_long[:] = np.nan
-    for i in range(len(ubins)):
-        idx = np.where(ubins[i] == np.abs(binNum_long))[0]
-        result_long[idx] = result[i]
-    result = result_long
+    result = result[idxConvert]
 
     # Create/Set output directory
     if os.path.isdir(os.path.join(outdir, "maps/")) == False:
@@ -182,8 +177,8 @@ def plotMaps(
     ymax = np.nanmax(Y) + 6
     npixels_x = int(np.round((xmax - xmin) / pixelsize) + 1)
     npixels_y = int(np.round((ymax - ymin) / pixelsize) + 1)
-    i = np.array(np.round((X - xmin) / pixelsize), dtype=np.int32)
-    j = np.array(np.round((Y - ymin) / pixelsize), dtype=np.int32)
+    i = np.rint((X - xmin) / pixelsize).astype(np.intp)
+    j = np.rint((Y - ymin) / pixelsize).astype(np.intp)
     image = np.full((npixels_x, npixels_y), np.nan)
     image[i, j] = val
 
@@ -210,11 +205,11 @@ def plotMaps(
     XY_Triangulation.set_mask(
         TriAnalyzer(XY_Triangulation).get_flat_tri_mask(0.01)
     )  # Remove bad triangles at the border of the field-of-view
-    levels = np.arange(
-        np.min(np.log10(FLUX)) + contour_offset, np.max(np.log10(FLUX)), 0.2
-    )
+    logFLUX = np.log10(FLUX)
+    logFLUX_min, logFLUX_max = np.nanmin(logFLUX), np.nanmax(logFLUX)
+    levels = np.arange(logFLUX_min + contour_offset, logFLUX_max, 0.2)
     grid[0].tricontour(
-        XY_Triangulation, np.log10(FLUX), levels=levels, linewidths=1, colors="k"
+        XY_Triangulation, logFLUX, levels=levels, linewidths=1, colors="k"
     )
 
     # Label vmin and vmax
@@ -71,19 +71,19 @@ def plotMaps(
     # Read bintable
     table_hdu = fits.open(os.path.join(outdir, rootname) + "_table.fits")
     idx_inside = np.where(table_hdu[1].data.BIN_ID >= 0)[0]
-    X = np.array(table_hdu[1].data.X[idx_inside]) * -1
-    Y = np.array(table_hdu[1].data.Y[idx_inside])
-    FLUX = np.array(table_hdu[1].data.FLUX[idx_inside])
-    binNum_long = np.array(table_hdu[1].data.BIN_ID[idx_inside])
-    ubins = np.unique(binNum_long)
+    X = table_hdu[1].data.X[idx_inside] * -1
+    Y = table_hdu[1].data.Y[idx_inside]
+    FLUX = table_hdu[1].data.FLUX[idx_inside]
+    binNum_long = table_hdu[1].data.BIN_ID[idx_inside]
+    ubins, idxConvert = np.unique(binNum_long, return_inverse=True)
     pixelsize = table_hdu[0].header["PIXSIZE"]
 
     # Check spatial coordinates
-    if len(np.where(np.logical_or(X == 0.0, np.isnan(X) == True))[0]) == len(X):
+    if np.all((X == 0.0) | np.isnan(X)):
         print(
             "All X-coordinates are 0.0 or np.nan. Plotting maps will not work without reasonable spatial information!"
         )
-    if len(np.where(np.logical_or(Y == 0.0, np.isnan(Y) == True))[0]) == len(Y):
+    if np.all((Y == 0.0) | np.isnan(Y)):
         print(
             "All Y-coordinates are 0.0 or np.nan. Plotting maps will not work without reasonable spatial information!\n"
         )
@@ -92,9 +92,9 @@ def plotMaps(
     if flag == "SFH":
         sfh_hdu = fits.open(os.path.join(outdir, rootname) + "_sfh.fits")
         result = np.zeros((len(ubins), 3))
-        result[:, 0] = np.array(sfh_hdu[1].data.AGE)
-        result[:, 1] = np.array(sfh_hdu[1].data.METAL)
-        result[:, 2] = np.array(sfh_hdu[1].data.ALPHA)
+        result[:, 0] = sfh_hdu[1].data.AGE
+        result[:, 1] = sfh_hdu[1].data.METAL
+        result[:, 2] = sfh_hdu[1].data.ALPHA
         if len(np.unique(result[:, 2])) == 1:
             labellist = ["AGE", "METAL"]
         else:
@@ -103,21 +103,16 @@ def plotMaps(
     elif flag == "LS":
         ls_hdu = fits.open(os.path.join(outdir, rootname) + "_ls_AdapRes.fits")
         result = np.zeros((len(ubins), 3))
-        result[:, 0] = np.array(ls_hdu[1].data.AGE)
-        result[:, 1] = np.array(ls_hdu[1].data.METAL)
-        result[:, 2] = np.array(ls_hdu[1].data.ALPHA)
+        result[:, 0] = ls_hdu[1].data.AGE
+        result[:, 1] = ls_hdu[1].data.METAL
+        result[:, 2] = ls_hdu[1].data.ALPHA
         if "ALPHA" in ls_hdu[1].data.columns.names:
             labellist = ["AGE", "METAL", "ALPHA"]
         else:
             labellist = ["AGE", "METAL"]
 
     # Convert results to long version
-    result_long = np.zeros((len(binNum_long), result.shape[1]))
-    result_long[:, :] = np.nan
-    for i in range(len(ubins)):
-        idx = np.where(ubins[i] == np.abs(binNum_long))[0]
-        result_long[idx, :] = result[i, :]
-    result = result_long
+    result = result[idxConvert, :]
 
     # ####### Adding the ability to output maps as fits files
     # primary_hdu = fits.PrimaryHDU()
@@ -176,6 +171,17 @@ def plotMaps(
     else:
         contour_offset = contour_offset_saved
 
+    # Prepare contours; the triangulation is identical for all panels
+    XY_Triangulation = Triangulation(
+        X - pixelsize / 2, Y - pixelsize / 2
+    )  # Create a mesh from a Delaunay triangulation
+    XY_Triangulation.set_mask(
+        TriAnalyzer(XY_Triangulation).get_flat_tri_mask(0.01)
+    )  # Remove bad triangles at the border of the field-of-view
+    logFLUX = np.log10(FLUX)
+    logFLUX_min, logFLUX_max = np.nanmin(logFLUX), np.nanmax(logFLUX)
+    levels = np.arange(logFLUX_min + contour_offset, logFLUX_max, 0.2)
+
     for iterate in range(0, nplots):
         # Prepare main plot
         val = result[:, iterate]
@@ -220,8 +226,8 @@ def plotMaps(
         ymax = np.nanmax(Y) + 5
         npixels_x = int(np.round((xmax - xmin) / pixelsize) + 1)
         npixels_y = int(np.round((ymax - ymin) / pixelsize) + 1)
-        i = np.array(np.round((X - xmin) / pixelsize), dtype=np.int32)
-        j = np.array(np.round((Y - ymin) / pixelsize), dtype=np.int32)
+        i = np.rint((X - xmin) / pixelsize).astype(np.intp)
+        j = np.rint((Y - ymin) / pixelsize).astype(np.intp)
         image = np.full((npixels_x, npixels_y), np.nan)
         image[i, j] = val
 
@@ -242,17 +248,8 @@ def plotMaps(
         grid.cbar_axes[iterate].colorbar(image)
 
         # Plot contours
-        XY_Triangulation = Triangulation(
-            X - pixelsize / 2, Y - pixelsize / 2
-        )  # Create a mesh from a Delaunay triangulation
-        XY_Triangulation.set_mask(
-            TriAnalyzer(XY_Triangulation).get_flat_tri_mask(0.01)
-        )  # Remove bad triangles at the border of the field-of-view
-        levels = np.arange(
-            np.min(np.log10(FLUX)) + contour_offset, np.max(np.log10(FLUX)), 0.2
-        )
         grid[iterate].tricontour(
-            XY_Triangulation, np.log10(FLUX), levels=levels, linewidths=1, colors="k"
+            XY_Triangulation, logFLUX, levels=levels, linewidths=1, colors="k"
         )
 
         # Label vmin and vmax
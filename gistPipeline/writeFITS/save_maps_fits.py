@@ -53,13 +53,13 @@ def savefitsmaps(module_id, outdir=""):
     # Read bintable
     table_hdu = fits.open(os.path.join(outdir, rootname) + "_table.fits")
     idx_inside = np.where(table_hdu[1].data.BIN_ID >= 0)[0]
-    X = np.array(table_hdu[1].data.X) * -1
+    X = table_hdu[1].data.X * -1
     Y = np.array(table_hdu[1].data.Y)
     FLUX = np.array(table_hdu[1].data.FLUX)
     XBIN = np.array(table_hdu[1].data.XBIN)
     YBIN = np.array(table_hdu[1].data.YBIN)
     binNum_long = np.array(table_hdu[1].data.BIN_ID)
-    ubins = np.unique(np.abs(np.array(table_hdu[1].data.BIN_ID)))
+    ubins, idxConvert = np.unique(np.abs(binNum_long), return_inverse=True)
     pixelsize = table_hdu[0].header["PIXSIZE"]
     oldwcshdr = table_hdu[2].header.copy()
 
@@ -69,11 +69,11 @@ def savefitsmaps(module_id, outdir=""):
     newwcshdr.update(diagonal_wcs_to_cdelt(wcs).to_header())
 
     # Check spatial coordinates
-    if len(np.where(np.logical_or(X == 0.0, np.isnan(X) == True))[0]) == len(X):
+    if np.all((X == 0.0) | np.isnan(X)):
         print(
             "All X-coordinates are 0.0 or np.nan. Plotting maps will not work without reasonable spatial information!"
         )
-    if len(np.where(np.logical_or(Y == 0.0, np.isnan(Y) == True))[0]) == len(Y):
+    if np.all((Y == 0.0) | np.isnan(Y)):
         print(
             "All Y-coordinates are 0.0 or np.nan. Plotting maps will not work without reasonable spatial information!\n"
         )
@@ -102,7 +102,7 @@ def savefitsmaps(module_id, outdir=""):
 
         result = np.zeros((len(ubins), len(names)))
         for i, name in enumerate(names):
-            result[:, i] = np.array(hdu[1].data[name])
+            result[:, i] = hdu[1].data[name]
 
     elif module_id == "SFH":
         # Read results
@@ -111,16 +111,11 @@ def savefitsmaps(module_id, outdir=""):
 
         result = np.zeros((len(ubins), len(names)))
         for i, name in enumerate(names):
-            result[:, i] = np.array(sfh_hdu[1].data[name])
+            result[:, i] = sfh_hdu[1].data[name]
 
     if (module_id == 'KIN') | (module_id == "SFH"):
         # Convert results to long version
-        result_long = np.zeros((len(binNum_long), result.shape[1]))
-        result_long[:, :] = np.nan
-        for i in range(len(ubins)):
-            idx = np.where(ubins[i] == np.abs(binNum_long))[0]
-            result_long[idx, :] = result[i, :]
-        result = result_long
+        result = result[idxConvert, :]
 
     # result[:, 0] = result[:, 0] - np.nanmedian(result[:, 0]) [median subtraction on products]
 
@@ -139,8 +134,8 @@ def savefitsmaps(module_id, outdir=""):
         ymax = np.max(Y)
         npixels_x = int(np.round((xmax - xmin) / pixelsize) + 1)
         npixels_y = int(np.round((ymax - ymin) / pixelsize) + 1)
-        i = np.array(np.round((X - xmin) / pixelsize), dtype=np.int32)
-        j = np.array(np.round((Y - ymin) / pixelsize), dtype=np.int32)
+        i = np.rint((X - xmin) / pixelsize).astype(np.intp)
+        j = np.rint((Y - ymin) / pixelsize).astype(np.intp)
         image = np.full((npixels_x, npixels_y), np.nan)
         # Reverse the i index to each row of the image
         # because ra increases West-East (right-left in image plane)
@@ -185,11 +180,11 @@ def savefitsmaps_GASmodule(module_id="GAS", outdir="", LEVEL="", AoNThreshold=4)
     # Read bintable
     table_hdu = fits.open(os.path.join(outdir, rootname) + "_table.fits")
     idx_inside = np.where(table_hdu[1].data.BIN_ID >= 0)[0]
-    X = np.array(table_hdu[1].data.X) * -1
+    X = table_hdu[1].data.X * -1
     Y = np.array(table_hdu[1].data.Y)
     FLUX = np.array(table_hdu[1].data.FLUX)
     binNum_long = np.array(table_hdu[1].data.BIN_ID)
-    ubins = np.unique(np.abs(binNum_long))
+    ubins, idxConvert = np.unique(np.abs(binNum_long), return_inverse=True)
     pixelsize = table_hdu[0].header["PIXSIZE"]
     oldwcshdr = table_hdu[2].header.copy()
 
@@ -201,11 +196,11 @@ def savefitsmaps_GASmodule(module_id="GAS", outdir="", LEVEL="", AoNThreshold=4)
     maskedSpaxel = maskedSpaxel[idx_inside]
 
     # Check spatial coordinates
-    if len(np.where(np.logical_or(X == 0.0, np.isnan(X) == True))[0]) == len(X):
+    if np.all((X == 0.0) | np.isnan(X)):
         print(
             "All X-coordinates are 0.0 or np.nan. Plotting maps will not work without reasonable spatial information!"
         )
-    if len(np.where(np.logical_or(Y == 0.0, np.isnan(Y) == True))[0]) == len(Y):
+    if np.all((Y == 0.0) | np.isnan(Y)):
         print(
             "All Y-coordinates are 0.0 or np.nan. Plotting maps will not work without reasonable spatial information!\n"
         )
@@ -221,7 +216,6 @@ def savefitsmaps_GASmodule(module_id="GAS", outdir="", LEVEL="", AoNThreshold=4)
 
     # Convert results to long version
     if LEVEL == "BIN":
-        _, idxConvert = np.unique(np.abs(binNum_long), return_inverse=True)
         results = results[idxConvert]
 
     primary_hdu = fits.PrimaryHDU()
@@ -254,8 +248,8 @@ def savefitsmaps_GASmodule(module_id="GAS", outdir="", LEVEL="", AoNThreshold=4)
         ymax = np.max(Y)
         npixels_x = int(np.round((xmax - xmin) / pixelsize) + 1)
         npixels_y = int(np.round((ymax - ymin) / pixelsize) + 1)
-        col = np.array(np.round((X - xmin) / pixelsize), dtype=np.int32)
-        row = np.array(np.round((Y - ymin) / pixelsize), dtype=np.int32)
+        col = np.rint((X - xmin) / pixelsize).astype(np.intp)
+        row = np.rint((Y - ymin) / pixelsize).astype(np.intp)
         image = np.full((npixels_x, npixels_y), np.nan)
 
         # reverse the index to flip vertically
@@ -297,11 +291,11 @@ def savefitsmaps_LSmodule(module_id="LS", outdir="", RESOLUTION=""):
     # Read bintable
     table_hdu = fits.open(os.path.join(outdir, rootname) + "_table.fits")
     idx_inside = np.where(table_hdu[1].data.BIN_ID >= 0)[0]
-    X = np.array(table_hdu[1].data.X) * -1
+    X = table_hdu[1].data.X * -1
     Y = np.array(table_hdu[1].data.Y)
     FLUX = np.array(table_hdu[1].data.FLUX)
     binNum_long = np.array(table_hdu[1].data.BIN_ID)
-    ubins = np.unique(np.abs(np.array(table_hdu[1].data.BIN_ID)))
+    ubins, idxConvert = np.unique(np.abs(binNum_long), return_inverse=True)
     pixelsize = table_hdu[0].header["PIXSIZE"]
     oldwcshdr = table_hdu[2].header.copy()
 
@@ -311,11 +305,11 @@ def savefitsmaps_LSmodule(module_id="LS", outdir="", RESOLUTION=""):
     newwcshdr.update(diagonal_wcs_to_cdelt(wcs).to_header())
 
     # Check spatial coordinates
-    if len(np.where(np.logical_or(X == 0.0, np.isnan(X) == True))[0]) == len(X):
+    if np.all((X == 0.0) | np.isnan(X)):
         print(
             "All X-coordinates are 0.0 or np.nan. Plotting maps will not work without reasonable spatial information!"
         )
-    if len(np.where(np.logical_or(Y == 0.0, np.isnan(Y) == True))[0]) == len(Y):
+    if np.all((Y == 0.0) | np.isnan(Y)):
         print(
             "All Y-coordinates are 0.0 or np.nan. Plotting maps will not work without reasonable spatial information!\n"
         )
@@ -330,15 +324,10 @@ def savefitsmaps_LSmodule(module_id="LS", outdir="", RESOLUTION=""):
 
     result = np.zeros((len(ubins), len(names)))
     for i, name in enumerate(names):
-        result[:, i] = np.array(hdu[1].data[name])
+        result[:, i] = hdu[1].data[name]
 
     # Convert results to long version
-    result_long = np.zeros((len(binNum_long), result.shape[1]))
-    result_long[:, :] = np.nan
-    for i in range(len(ubins)):
-        idx = np.where(ubins[i] == np.abs(binNum_long))[0]
-        result_long[idx, :] = result[i, :]
-    result = result_long
+    result = result[idxConvert, :]
 
     # result[:, 0] = result[:, 0] - np.nanmedian(result[:, 0]) [median subtraction on products]
 
@@ -357,8 +346,8 @@ def savefitsmaps_LSmodule(module_id="LS", outdir="", RESOLUTION=""):
         ymax = np.max(Y)
         npixels_x = int(np.round((xmax - xmin) / pixelsize) + 1)
         npixels_y = int(np.round((ymax - ymin) / pixelsize) + 1)
-        i = np.array(np.round((X - xmin) / pixelsize), dtype=np.int32)
-        j = np.array(np.round((Y - ymin) / pixelsize), dtype=np.int32)
+        i = np.rint((X - xmin) / pixelsize).astype(np.intp)
+        j = np.rint((Y - ymin) / pixelsize).astype(np.intp)
         image = np.full((npixels_x, npixels_y), np.nan)
 
         # Reverse the i index to each row of the image